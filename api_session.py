@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Shared HTTP session setup for the CourtChime backend test scripts
+"""
+
+import time
+from typing import Any, Dict, Optional
+
+import orjson
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# (connect, read) seconds applied to any request sent without an explicit timeout
+REQUEST_TIMEOUT = (3.05, 10)
+
+
+class TimeoutHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter that fills in a default timeout so a stalled backend cannot hang a script"""
+
+    def __init__(self, *args, timeout=REQUEST_TIMEOUT, **kwargs):
+        self.timeout = timeout
+        super().__init__(*args, **kwargs)
+
+    def send(self, request, **kwargs):
+        if kwargs.get("timeout") is None:
+            kwargs["timeout"] = self.timeout
+        return super().send(request, **kwargs)
+
+
+def make_session(pool_connections: int = 4, pool_maxsize: int = 32, retries: int = 0,
+                 trust_env: bool = True) -> requests.Session:
+    """
+    Create a requests.Session whose keep-alive pool is mounted for both http and https.
+    With retries > 0, idempotent requests are retried with backoff on 502/503/504 responses;
+    the final response is returned rather than raised when retries are exhausted.
+    Requests without an explicit timeout use REQUEST_TIMEOUT.
+    With trust_env=False, requests skips the per-call proxy, netrc and CA-bundle lookups in the environment.
+    """
+    session = requests.Session()
+    session.trust_env = trust_env
+    # raise_on_status=False hands back the last 5xx response once retries run out, so status checks still see it
+    max_retries = Retry(total=retries, backoff_factor=0.1, status_forcelist=(502, 503, 504),
+                        raise_on_status=False) if retries else 0
+    adapter = TimeoutHTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, max_retries=max_retries)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers["Connection"] = "keep-alive"
+    return session
+
+
+def wait_for_player(session: requests.Session, players_url: str, player_id: str, expected: Optional[bool],
+                    timeout: float = 1.0, interval: float = 0.01) -> Optional[Dict[str, Any]]:
+    """
+    Re-read the players list until the player's isActive matches expected or the timeout passes.
+    Returns the last copy of the player seen (None if absent); expected=None reads once.
+    """
+    deadline = time.monotonic() + timeout
+    while True:
+        response = session.get(players_url)
+        response.raise_for_status()
+        player = next((p for p in orjson.loads(response.content) if p["id"] == player_id), None)
+        if expected is None or (player and player.get("isActive") == expected) or time.monotonic() >= deadline:
+            return player
+        time.sleep(interval)
@@ -1,5 +1,6 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends, Request
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from pydantic import BaseModel, Field
 from typing import Optional, List, Any, Dict
 from enum import Enum
@@ -13,10 +14,12 @@ import json
 import logging
 from pathlib import Path
 from collections import defaultdict
+from itertools import chain
 from dotenv import load_dotenv
 # Import SQLAlchemy components
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, delete, update, and_, or_
+from sqlalchemy.exc import IntegrityError
 import sys
 import os
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
@@ -45,6 +48,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compress larger JSON responses (match lists, player rosters) for clients that accept gzip
+app.add_middleware(GZipMiddleware, minimum_size=1000)
+
 # Enums
 class MatchStatus(str, Enum):
     pending = "pending"
@@ -116,9 +122,15 @@ class Player(BaseModel):
     stats: PlayerStats = Field(default_factory=PlayerStats)
 
 class PlayerCreate(BaseModel):
+    id: Optional[str] = Field(None, min_length=1, max_length=64, pattern=r"^[A-Za-z0-9_-]+$")  # Client-supplied ID; generated when omitted
     name: str
     category: str
 
+class PlayersBulkCreated(BaseModel):
+    message: str
+    count: int
+    ids: List[str]
+
 class PlayerUpdate(BaseModel):
     name: Optional[str] = None
     category: Optional[str] = None
@@ -232,32 +244,30 @@ async def update_player_ratings(match: dict, teamA_score: int, teamB_score: int,
     Update player ratings based on match result (DUPR-style) - SQLite version
     """
     try:
-        # Get all players in the match
+        # Get all players in the match with one query, indexed by id
         all_player_ids = match['teamA'] + match['teamB']
-        players = []
+        result = await db_session.execute(select(DBPlayer).where(DBPlayer.id.in_(all_player_ids)))
+        players_by_id = {}
         
-        for player_id in all_player_ids:
-            result = await db_session.execute(select(DBPlayer).where(DBPlayer.id == player_id))
-            db_player = result.scalar_one_or_none()
-            if db_player:
-                # Convert to dict format for compatibility
-                player_dict = {
-                    'id': db_player.id,
-                    'rating': db_player.rating,
-                    'matchesPlayed': db_player.matches_played,
-                    'wins': db_player.wins,
-                    'losses': db_player.losses,
-                    'recentForm': json.loads(db_player.recent_form) if db_player.recent_form else [],
-                    'ratingHistory': json.loads(db_player.rating_history) if db_player.rating_history else []
-                }
-                players.append((db_player, player_dict))
+        for db_player in result.scalars().all():
+            # Convert to dict format for compatibility
+            player_dict = {
+                'id': db_player.id,
+                'rating': db_player.rating,
+                'matchesPlayed': db_player.matches_played,
+                'wins': db_player.wins,
+                'losses': db_player.losses,
+                'recentForm': json.loads(db_player.recent_form) if db_player.recent_form else [],
+                'ratingHistory': json.loads(db_player.rating_history) if db_player.rating_history else []
+            }
+            players_by_id[db_player.id] = (db_player, player_dict)
         
-        if len(players) != len(all_player_ids):
+        if any(player_id not in players_by_id for player_id in all_player_ids):
             return  # Some players not found
         
         # Split into teams
-        teamA_players = [(db_p, p_dict) for db_p, p_dict in players if p_dict['id'] in match['teamA']]
-        teamB_players = [(db_p, p_dict) for db_p, p_dict in players if p_dict['id'] in match['teamB']]
+        teamA_players = [players_by_id[player_id] for player_id in match['teamA']]
+        teamB_players = [players_by_id[player_id] for player_id in match['teamB']]
         
         # Calculate average ratings for each team
         teamA_avg = sum(p_dict['rating'] for _, p_dict in teamA_players) / len(teamA_players)
@@ -353,41 +363,45 @@ async def update_player_ratings(match: dict, teamA_score: int, teamB_score: int,
         print(f"Error updating player ratings: {e}")
         # Continue without failing the match score update
 
+# Shared default for players with no history yet; never mutated
+_EMPTY_HISTORY: Dict[str, int] = {}
+
 def calculate_partner_score(player_a: str, player_b: str, histories: Dict[str, Any]) -> int:
     """Calculate how often two players have been partners"""
-    partner_history = histories.get('partnerHistory', {})
-    return partner_history.get(player_a, {}).get(player_b, 0)
+    partner_history = histories.get('partnerHistory', _EMPTY_HISTORY)
+    return partner_history.get(player_a, _EMPTY_HISTORY).get(player_b, 0)
 
 def calculate_opponent_score(team_a: List[str], team_b: List[str], histories: Dict[str, Any]) -> int:
     """Calculate opponent history score between two teams"""
-    opponent_history = histories.get('opponentHistory', {})
+    opponent_history = histories.get('opponentHistory', _EMPTY_HISTORY)
     total_score = 0
     
     for player_a in team_a:
+        player_a_history = opponent_history.get(player_a, _EMPTY_HISTORY)
         for player_b in team_b:
-            total_score += opponent_history.get(player_a, {}).get(player_b, 0)
+            total_score += player_a_history.get(player_b, 0)
     
     return total_score
 
-def calculate_team_rating_avg(team: List[str], players: List[Player]) -> float:
-    """Calculate average rating for a team"""
-    team_players = [p for p in players if p.id in team]
-    if not team_players:
+def calculate_team_rating_avg(team: List[str], ratings: Dict[str, float]) -> float:
+    """Calculate average rating for a team from a player-id -> rating index"""
+    team_ratings = [ratings[pid] for pid in team if pid in ratings]
+    if not team_ratings:
         return 3.0
-    return sum(p.rating for p in team_players) / len(team_players)
+    return sum(team_ratings) / len(team_ratings)
 
 def calculate_rating_variance(matches: List[Match], players: List[Player]) -> float:
     """Calculate rating variance across all matches for better balance"""
     if not matches:
         return 0.0
     
-    rating_differences = []
-    for match in matches:
-        team_a_avg = calculate_team_rating_avg(match.teamA, players)
-        team_b_avg = calculate_team_rating_avg(match.teamB, players)
-        rating_differences.append(abs(team_a_avg - team_b_avg))
+    # Index ratings once instead of scanning the roster for every team
+    ratings = {p.id: p.rating for p in players}
     
-    return sum(rating_differences) / len(rating_differences)
+    return sum(
+        abs(calculate_team_rating_avg(match.teamA, ratings) - calculate_team_rating_avg(match.teamB, ratings))
+        for match in matches
+    ) / len(matches)
 
 def enhanced_shuffle_with_rating_balance(players: List[Player], num_iterations: int = 5) -> List[Player]:
     """
@@ -415,42 +429,28 @@ def enhanced_shuffle_with_rating_balance(players: List[Player], num_iterations:
     
     return best_shuffle or players
 
+def _record_pair(history: Dict[str, Dict[str, int]], player_a: str, player_b: str) -> None:
+    """Increment the symmetric pair count for two players in a partner/opponent history"""
+    row_a = history.setdefault(player_a, {})
+    row_a[player_b] = row_a.get(player_b, 0) + 1
+    row_b = history.setdefault(player_b, {})
+    row_b[player_a] = row_b.get(player_a, 0) + 1
+
 def update_histories(match: Match, histories: Dict[str, Any]) -> Dict[str, Any]:
     """Update partner and opponent histories based on a match"""
-    if 'partnerHistory' not in histories:
-        histories['partnerHistory'] = {}
-    if 'opponentHistory' not in histories:
-        histories['opponentHistory'] = {}
+    partner_history = histories.setdefault('partnerHistory', {})
+    opponent_history = histories.setdefault('opponentHistory', {})
     
     # Update partner histories (for doubles)
     if match.matchType == MatchType.doubles:
-        if len(match.teamA) == 2:
-            a1, a2 = match.teamA[0], match.teamA[1]
-            if a1 not in histories['partnerHistory']:
-                histories['partnerHistory'][a1] = {}
-            if a2 not in histories['partnerHistory']:
-                histories['partnerHistory'][a2] = {}
-            histories['partnerHistory'][a1][a2] = histories['partnerHistory'][a1].get(a2, 0) + 1
-            histories['partnerHistory'][a2][a1] = histories['partnerHistory'][a2].get(a1, 0) + 1
-        
-        if len(match.teamB) == 2:
-            b1, b2 = match.teamB[0], match.teamB[1]
-            if b1 not in histories['partnerHistory']:
-                histories['partnerHistory'][b1] = {}
-            if b2 not in histories['partnerHistory']:
-                histories['partnerHistory'][b2] = {}
-            histories['partnerHistory'][b1][b2] = histories['partnerHistory'][b1].get(b2, 0) + 1
-            histories['partnerHistory'][b2][b1] = histories['partnerHistory'][b2].get(b1, 0) + 1
+        for team in (match.teamA, match.teamB):
+            if len(team) == 2:
+                _record_pair(partner_history, team[0], team[1])
     
     # Update opponent histories
     for player_a in match.teamA:
         for player_b in match.teamB:
-            if player_a not in histories['opponentHistory']:
-                histories['opponentHistory'][player_a] = {}
-            if player_b not in histories['opponentHistory']:
-                histories['opponentHistory'][player_b] = {}
-            histories['opponentHistory'][player_a][player_b] = histories['opponentHistory'][player_a].get(player_b, 0) + 1
-            histories['opponentHistory'][player_b][player_a] = histories['opponentHistory'][player_b].get(player_a, 0) + 1
+            _record_pair(opponent_history, player_a, player_b)
     
     return histories
 
@@ -649,7 +649,7 @@ async def schedule_round(round_index: int, db_session: AsyncSession = None, club
         
         # Debug logging for optimization
         if config.maximizeCourtUsage:
-            print(f"DEBUG: Category {cat_name} - {count} players -> {doubles_matches} doubles, {singles_matches} singles")
+            logger.debug("Category %s - %d players -> %d doubles, %d singles", cat_name, count, doubles_matches, singles_matches)
     
     # Calculate total courts needed - FIXED for optimization
     total_courts_needed = sum(plan['doubles'] + plan['singles'] for plan in court_plans.values())
@@ -657,10 +657,10 @@ async def schedule_round(round_index: int, db_session: AsyncSession = None, club
     # CRITICAL FIX: When optimization is enabled, don't limit courts to initially planned amount
     if config.maximizeCourtUsage:
         available_courts = config.numCourts  # Use all available courts
-        print(f"DEBUG: Optimization enabled - using all {available_courts} courts, planned {total_courts_needed} matches")
+        logger.debug("Optimization enabled - using all %d courts, planned %d matches", available_courts, total_courts_needed)
     else:
         available_courts = min(config.numCourts, total_courts_needed)
-        print(f"DEBUG: Standard mode - limiting to {available_courts} courts for {total_courts_needed} matches")
+        logger.debug("Standard mode - limiting to %d courts for %d matches", available_courts, total_courts_needed)
     
     # Court Allocation Optimization: Maximize court usage if enabled
     if config.maximizeCourtUsage and total_courts_needed < config.numCourts:
@@ -741,7 +741,7 @@ async def schedule_round(round_index: int, db_session: AsyncSession = None, club
         # Recalculate total courts needed after optimization
         total_courts_needed = sum(plan['doubles'] + plan['singles'] for plan in court_plans.values())
         # DON'T override available_courts here - keep the optimization setting from above
-        print(f"DEBUG: After optimization - total_courts_needed: {total_courts_needed}, available_courts: {available_courts}")
+        logger.debug("After optimization - total_courts_needed: %d, available_courts: %d", total_courts_needed, available_courts)
     
     # Fair court allocation across categories (rotate by round)
     if config.allowCrossCategory:
@@ -768,7 +768,7 @@ async def schedule_round(round_index: int, db_session: AsyncSession = None, club
         
         # Debug logging for court allocation
         if config.maximizeCourtUsage:
-            print(f"DEBUG: Allocating {doubles_to_allocate}/{plan['doubles']} doubles for {cat_name}, courts_used: {courts_used}/{available_courts}")
+            logger.debug("Allocating %d/%d doubles for %s, courts_used: %d/%d", doubles_to_allocate, plan['doubles'], cat_name, courts_used, available_courts)
         
         if courts_used >= available_courts:
             break
@@ -952,6 +952,10 @@ async def create_doubles_matches(
         teams = valid_teams
         print(f"Fixed: Reduced teams from {len(teams) + len(duplicates)} to {len(teams)}")
     
+    # Team averages don't change between pairing attempts; every team member comes from players
+    ratings = {p.id: p.rating for p in players}
+    team_avgs = [calculate_team_rating_avg(team, ratings) for team in teams]
+    
     # Try multiple team pairing combinations for better balance
     best_matches = []
     best_rating_variance = float('inf')
@@ -959,6 +963,7 @@ async def create_doubles_matches(
     for attempt in range(3):  # Try 3 different pairing approaches
         current_matches = []
         current_used = set()
+        current_match_players = set()  # Everyone already placed in current_matches
         
         team_order = list(range(len(teams)))
         if attempt > 0:
@@ -990,9 +995,7 @@ async def create_doubles_matches(
                     continue
                 
                 # 2. Ensure no player from this proposed match appears in current matches
-                players_in_proposed_match = team_a + team_b
-                already_used = [p for p in players_in_proposed_match if any(p in m.teamA or p in m.teamB for m in current_matches)]
-                if already_used:
+                if any(p in current_match_players for p in chain(team_a, team_b)):
                     # Skip this opponent - contains already-used players
                     continue
                 
@@ -1000,9 +1003,7 @@ async def create_doubles_matches(
                 opponent_history_score = calculate_opponent_score(team_a, team_b, histories)
                 
                 # Rating balance factor - prefer closer team average ratings
-                team_a_avg = calculate_team_rating_avg(team_a, players)
-                team_b_avg = calculate_team_rating_avg(team_b, players)
-                rating_balance_penalty = abs(team_a_avg - team_b_avg) * 0.3
+                rating_balance_penalty = abs(team_avgs[idx] - team_avgs[j_idx]) * 0.3
                 
                 composite_opponent_score = opponent_history_score + rating_balance_penalty
                 
@@ -1022,6 +1023,8 @@ async def create_doubles_matches(
                     status=MatchStatus.pending
                 )
                 current_matches.append(match)
+                current_match_players.update(team_a)
+                current_match_players.update(best_opponent_team)
                 current_used.add(idx)
                 current_used.add(best_opponent_index)
         
@@ -1123,6 +1126,11 @@ async def create_singles_matches(
 
 # API Routes
 
+@api_router.get("/health", response_model=dict)
+async def health_check():
+    """Lightweight liveness check that does not touch the database"""
+    return {"status": "ok"}
+
 # Clubs
 @api_router.get("/clubs", response_model=List[Club])
 async def get_clubs(db_session: AsyncSession = Depends(get_db_session)):
@@ -1443,32 +1451,32 @@ async def clear_all_data(db: AsyncSession = Depends(get_db_session)):
         await db.rollback()
         raise HTTPException(status_code=500, detail=f"Failed to clear data: {str(e)}")
 
+# Sample players with ratings for /add-test-data
+TEST_PLAYERS = (
+    {"name": "John Smith", "category": "Beginner", "rating": 3.2},
+    {"name": "Jane Doe", "category": "Beginner", "rating": 3.5},
+    {"name": "Mike Johnson", "category": "Intermediate", "rating": 4.1},
+    {"name": "Sarah Wilson", "category": "Intermediate", "rating": 4.3},
+    {"name": "David Brown", "category": "Advanced", "rating": 5.2},
+    {"name": "Lisa Garcia", "category": "Advanced", "rating": 5.5},
+    {"name": "Tom Anderson", "category": "Beginner", "rating": 3.0},
+    {"name": "Emily Chen", "category": "Intermediate", "rating": 4.0},
+    {"name": "Robert Taylor", "category": "Advanced", "rating": 5.8},
+    {"name": "Maria Rodriguez", "category": "Beginner", "rating": 3.3},
+    {"name": "James Wilson", "category": "Intermediate", "rating": 4.2},
+    {"name": "Ashley Johnson", "category": "Advanced", "rating": 5.1}
+)
+
 @api_router.post("/add-test-data", response_model=dict)
 async def add_test_data(db: AsyncSession = Depends(get_db_session)):
     """Add sample test players for testing purposes"""
     try:
-        # Sample players with ratings
-        test_players = [
-            {"name": "John Smith", "category": "Beginner", "rating": 3.2},
-            {"name": "Jane Doe", "category": "Beginner", "rating": 3.5},
-            {"name": "Mike Johnson", "category": "Intermediate", "rating": 4.1},
-            {"name": "Sarah Wilson", "category": "Intermediate", "rating": 4.3},
-            {"name": "David Brown", "category": "Advanced", "rating": 5.2},
-            {"name": "Lisa Garcia", "category": "Advanced", "rating": 5.5},
-            {"name": "Tom Anderson", "category": "Beginner", "rating": 3.0},
-            {"name": "Emily Chen", "category": "Intermediate", "rating": 4.0},
-            {"name": "Robert Taylor", "category": "Advanced", "rating": 5.8},
-            {"name": "Maria Rodriguez", "category": "Beginner", "rating": 3.3},
-            {"name": "James Wilson", "category": "Intermediate", "rating": 4.2},
-            {"name": "Ashley Johnson", "category": "Advanced", "rating": 5.1}
-        ]
-        
         # Clear existing players first
         await db.execute(delete(DBPlayer))
         
         # Add test players to Main Club
         created_count = 0
-        for player_data in test_players:
+        for player_data in TEST_PLAYERS:
             player = DBPlayer(
                 name=player_data["name"],
                 category=player_data["category"],
@@ -1572,19 +1580,26 @@ async def get_sqlite_players(db_session: AsyncSession = Depends(get_db_session))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get players: {str(e)}")
 
+def new_db_player(player: PlayerCreate, club_name: str) -> DBPlayer:
+    """Build a new DBPlayer with default rating and empty history, keeping a client-supplied ID"""
+    db_player = DBPlayer(
+        name=player.name,
+        category=player.category,
+        club_name=club_name,  # Assign to specific club
+        rating=3.0,  # Default DUPR rating
+        recent_form=json.dumps([]),  # Empty recent form
+        rating_history=json.dumps([])  # Empty rating history
+    )
+    if player.id:
+        db_player.id = player.id
+    return db_player
+
 @api_router.post("/players", response_model=Player)
 async def create_player(player: PlayerCreate, club_name: str = "Main Club", db_session: AsyncSession = Depends(get_db_session)):
     """Create a new player in SQLite database"""
     try:
         # Create SQLAlchemy player object
-        db_player = DBPlayer(
-            name=player.name,
-            category=player.category,
-            club_name=club_name,  # Assign to specific club
-            rating=3.0,  # Default DUPR rating
-            recent_form=json.dumps([]),  # Empty recent form
-            rating_history=json.dumps([])  # Empty rating history
-        )
+        db_player = new_db_player(player, club_name)
         
         db_session.add(db_player)
         await db_session.commit()
@@ -1615,10 +1630,33 @@ async def create_player(player: PlayerCreate, club_name: str = "Main Club", db_s
         
         return Player(**player_dict)
         
+    except IntegrityError:
+        await db_session.rollback()
+        raise HTTPException(status_code=409, detail=f"Player ID {player.id} already exists")
     except Exception as e:
         await db_session.rollback()
         raise HTTPException(status_code=500, detail=f"Failed to create player: {str(e)}")
 
+@api_router.post("/players/bulk", response_model=PlayersBulkCreated)
+async def create_players_bulk(players: List[PlayerCreate], club_name: str = "Main Club", db_session: AsyncSession = Depends(get_db_session)):
+    """Create several players in one transaction"""
+    try:
+        db_players = [new_db_player(player, club_name) for player in players]
+        db_session.add_all(db_players)
+        
+        await db_session.commit()
+        return PlayersBulkCreated(
+            message=f"Created {len(db_players)} players",
+            count=len(db_players),
+            ids=[db_player.id for db_player in db_players]
+        )
+    except IntegrityError:
+        await db_session.rollback()
+        raise HTTPException(status_code=409, detail="One or more player IDs already exist")
+    except Exception as e:
+        await db_session.rollback()
+        raise HTTPException(status_code=500, detail=f"Failed to create players: {str(e)}")
+
 @api_router.put("/players/{player_id}", response_model=Player)
 async def update_player(player_id: str, updates: PlayerUpdate, db_session: AsyncSession = Depends(get_db_session)):
     """Update a player in SQLite database"""
@@ -1696,9 +1734,14 @@ async def delete_player(player_id: str, club_name: str = "Main Club", db_session
         await db_session.rollback()
         raise HTTPException(status_code=500, detail=f"Failed to delete player: {str(e)}")
 
+MAX_TOGGLE_COUNT = 10  # Upper bound on toggles applied by one request
+
 @api_router.patch("/players/{player_id}/toggle-active")
-async def toggle_player_active_status(player_id: str, club_name: str = "Main Club", db_session: AsyncSession = Depends(get_db_session)):
-    """Toggle player's active status for daily sessions (soft delete/restore)"""
+async def toggle_player_active_status(player_id: str, club_name: str = "Main Club", count: int = Query(1, ge=1, le=MAX_TOGGLE_COUNT), db_session: AsyncSession = Depends(get_db_session)):
+    """
+    Toggle player's active status for daily sessions (soft delete/restore)
+    count applies several toggles in one request; history lists the status after each one
+    """
     try:
         result = await db_session.execute(select(DBPlayer).where(DBPlayer.id == player_id, DBPlayer.club_name == club_name))
         player = result.scalar_one_or_none()
@@ -1707,13 +1750,17 @@ async def toggle_player_active_status(player_id: str, club_name: str = "Main Clu
             raise HTTPException(status_code=404, detail="Player not found")
         
         # Toggle active status
-        player.is_active = not player.is_active
+        history = []
+        for _ in range(count):
+            player.is_active = not player.is_active
+            history.append(player.is_active)
         await db_session.commit()
         
         status = "activated" if player.is_active else "deactivated"
         return {
             "message": f"Player {player.name} {status} for today's session",
-            "isActive": player.is_active
+            "isActive": player.is_active,
+            "history": history
         }
         
     except HTTPException:
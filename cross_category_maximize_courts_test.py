@@ -4,31 +4,60 @@ CourtChime Backend Test Suite - Cross Category + Maximize Courts Bug Fix Verific
 Testing the fix for players sitting out unnecessarily when both options are enabled.
 """
 
-import requests
-import json
-import time
-from typing import Dict, List, Any
+import os
+from dataclasses import dataclass
+from functools import lru_cache
+from itertools import chain
+from typing import Dict, List, Any, Optional, Tuple, Union
+
+import orjson
+
+from api_session import make_session
 
 # Configuration
-BASE_URL = "https://courtchime.preview.emergentagent.com/api"
+BASE_URL = os.getenv("BACKEND_URL", "https://courtchime.preview.emergentagent.com/api")
 CLUB_NAME = "Main Club"
 ACCESS_CODE = "demo123"
+JSON_HEADERS = {"Content-Type": "application/json"}
+MATCH_REQUIRED_FIELDS = ("id", "teamA", "teamB", "courtIndex", "roundIndex", "category", "matchType")
+
+
+@lru_cache(maxsize=32)
+def scenario_config_body(num_courts: int) -> bytes:
+    """Serialized Cross Category + Maximize Courts config, built once per court count"""
+    return orjson.dumps({
+        "allowCrossCategory": True,
+        "maximizeCourtUsage": True,
+        "numCourts": num_courts,
+        "allowDoubles": True,
+        "allowSingles": True
+    })
+
+@dataclass(slots=True)
+class CheckResult:
+    """Outcome of a single check"""
+    test: str
+    status: str
+    success: bool
+    details: str
 
 class CrossCategoryMaximizeCourtsTester:
     def __init__(self):
-        self.session = requests.Session()
-        self.test_results = []
+        self.session = make_session(retries=3)  # Transient 502/503/504s are retried by the adapter
+        self.test_results: List[CheckResult] = []
+        self.failed_tests: List[CheckResult] = []  # Filled as results are logged, so the summary needs no rescan
+        # Match lists keyed by (path, epoch); the epoch bumps whenever matches are cleared or generated
+        self._cache: Dict[Tuple[str, int], Any] = {}
+        self._epoch = 0
+        self._active_players: Optional[List[Dict[str, Any]]] = None
         
     def log_test(self, test_name: str, success: bool, details: str = ""):
         """Log test result"""
         status = "✅ PASS" if success else "❌ FAIL"
-        result = {
-            "test": test_name,
-            "status": status,
-            "success": success,
-            "details": details
-        }
+        result = CheckResult(test_name, status, success, details)
         self.test_results.append(result)
+        if not success:
+            self.failed_tests.append(result)
         print(f"{status}: {test_name}")
         if details:
             print(f"   Details: {details}")
@@ -43,7 +72,7 @@ class CrossCategoryMaximizeCourtsTester:
             })
             
             if response.status_code == 200:
-                data = response.json()
+                data = orjson.loads(response.content)
                 success = (data.get("authenticated") == True and 
                           data.get("club_name") == CLUB_NAME)
                 return self.log_test("Club Authentication", success, 
@@ -58,32 +87,37 @@ class CrossCategoryMaximizeCourtsTester:
         """Get current session configuration"""
         try:
             response = self.session.get(f"{BASE_URL}/session", params={"club_name": CLUB_NAME})
-            if response.status_code == 200:
-                return response.json()
-            return {}
+            response.raise_for_status()
+            return orjson.loads(response.content)
         except Exception as e:
             print(f"Error getting session config: {e}")
             return {}
     
-    def update_session_config(self, config_updates: Dict[str, Any]) -> bool:
-        """Update session configuration"""
+    def update_session_config(self, config_updates: Union[Dict[str, Any], bytes]) -> bool:
+        """Update session configuration (accepts a dict or a pre-serialized JSON body)"""
         try:
-            response = self.session.put(f"{BASE_URL}/session/config", 
-                                      params={"club_name": CLUB_NAME},
-                                      json=config_updates)
+            if isinstance(config_updates, bytes):
+                response = self.session.put(f"{BASE_URL}/session/config",
+                                          params={"club_name": CLUB_NAME},
+                                          data=config_updates, headers=JSON_HEADERS)
+            else:
+                response = self.session.put(f"{BASE_URL}/session/config", 
+                                          params={"club_name": CLUB_NAME},
+                                          json=config_updates)
             return response.status_code == 200
         except Exception as e:
             print(f"Error updating session config: {e}")
             return False
     
     def get_active_players(self) -> List[Dict[str, Any]]:
-        """Get all active players"""
+        """Get all active players (fetched once; this suite never changes the roster)"""
+        if self._active_players is not None:
+            return self._active_players
         try:
             response = self.session.get(f"{BASE_URL}/players", params={"club_name": CLUB_NAME})
-            if response.status_code == 200:
-                players = response.json()
-                return [p for p in players if p.get("isActive", False)]
-            return []
+            response.raise_for_status()
+            self._active_players = [p for p in orjson.loads(response.content) if p.get("isActive", False)]
+            return self._active_players
         except Exception as e:
             print(f"Error getting players: {e}")
             return []
@@ -91,8 +125,10 @@ class CrossCategoryMaximizeCourtsTester:
     def clear_existing_matches(self) -> bool:
         """Clear existing matches"""
         try:
-            response = self.session.delete(f"{BASE_URL}/matches", params={"club_name": CLUB_NAME})
-            return response.status_code in [200, 204, 404]  # 404 is OK if no matches exist
+            self._epoch += 1
+            # /session/reset deletes the club's matches and rewinds the round; the API has no DELETE /matches
+            response = self.session.post(f"{BASE_URL}/session/reset", params={"club_name": CLUB_NAME})
+            return response.status_code == 200
         except Exception as e:
             print(f"Error clearing matches: {e}")
             return False
@@ -100,10 +136,11 @@ class CrossCategoryMaximizeCourtsTester:
     def generate_matches(self) -> Dict[str, Any]:
         """Generate matches and return response data"""
         try:
+            self._epoch += 1
             response = self.session.post(f"{BASE_URL}/session/generate-matches", 
                                        params={"club_name": CLUB_NAME})
             if response.status_code == 200:
-                return response.json()
+                return orjson.loads(response.content)
             else:
                 print(f"Generate matches failed: {response.status_code} - {response.text}")
                 return {}
@@ -112,12 +149,15 @@ class CrossCategoryMaximizeCourtsTester:
             return {}
     
     def get_matches(self) -> List[Dict[str, Any]]:
-        """Get current matches"""
+        """Get current matches, reusing the last response until matches change"""
+        key = ("/matches", self._epoch)
+        if key in self._cache:
+            return self._cache[key]
         try:
             response = self.session.get(f"{BASE_URL}/matches", params={"club_name": CLUB_NAME})
-            if response.status_code == 200:
-                return response.json()
-            return []
+            response.raise_for_status()
+            self._cache = {key: orjson.loads(response.content)}
+            return self._cache[key]
         except Exception as e:
             print(f"Error getting matches: {e}")
             return []
@@ -174,16 +214,12 @@ class CrossCategoryMaximizeCourtsTester:
         test_players = active_players[:num_players]
         
         # Clear existing matches
-        self.clear_existing_matches()
+        if not self.clear_existing_matches():
+            return self.log_test(f"{scenario_name} - Clear Matches", False,
+                               "Failed to reset session")
         
         # Update session config for Cross Category + Maximize Courts
-        config_success = self.update_session_config({
-            "allowCrossCategory": True,
-            "maximizeCourtUsage": True,
-            "numCourts": num_courts,
-            "allowDoubles": True,
-            "allowSingles": True
-        })
+        config_success = self.update_session_config(scenario_config_body(num_courts))
         
         if not config_success:
             return self.log_test(f"{scenario_name} - Config Update", False, 
@@ -239,8 +275,7 @@ class CrossCategoryMaximizeCourtsTester:
         issues = []
         for i, match in enumerate(matches):
             # Check required fields
-            required_fields = ["id", "teamA", "teamB", "courtIndex", "roundIndex", "category", "matchType"]
-            for field in required_fields:
+            for field in MATCH_REQUIRED_FIELDS:
                 if field not in match:
                     issues.append(f"Match {i}: Missing field '{field}'")
             
@@ -255,8 +290,7 @@ class CrossCategoryMaximizeCourtsTester:
                 issues.append(f"Match {i}: Empty teams not allowed")
             
             # Check for duplicate player assignments
-            all_players_in_match = team_a + team_b
-            if len(all_players_in_match) != len(set(all_players_in_match)):
+            if len(set(chain(team_a, team_b))) != len(team_a) + len(team_b):
                 issues.append(f"Match {i}: Duplicate player assignments")
             
             # Check category for cross-category mode
@@ -320,8 +354,8 @@ class CrossCategoryMaximizeCourtsTester:
         print("📊 TEST SUMMARY")
         print("=" * 70)
         
-        passed = sum(1 for r in self.test_results if r["success"])
         total = len(self.test_results)
+        passed = total - len(self.failed_tests)
         success_rate = (passed / total * 100) if total > 0 else 0
         
         print(f"Total Tests: {total}")
@@ -331,9 +365,9 @@ class CrossCategoryMaximizeCourtsTester:
         
         print("\n📋 DETAILED RESULTS:")
         for result in self.test_results:
-            print(f"{result['status']}: {result['test']}")
-            if result['details']:
-                print(f"   {result['details']}")
+            print(f"{result.status}: {result.test}")
+            if result.details:
+                print(f"   {result.details}")
         
         # Final verdict
         if success_rate >= 90:
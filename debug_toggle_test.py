@@ -3,76 +3,80 @@
 Debug test for toggle issue
 """
 
-import requests
-import json
-import time
+import logging
+import os
 
-BACKEND_URL = "https://courtchime.preview.emergentagent.com/api"
+import orjson
+
+from api_session import make_session, wait_for_player
+
+BACKEND_URL = os.getenv("BACKEND_URL", "https://courtchime.preview.emergentagent.com/api")
+VERBOSE = os.getenv("VERBOSE") == "1"
+
+logger = logging.getLogger(__name__)
+
+def wait_for_db_status(session, player_id, expected):
+    """Poll the database for the player's isActive until it matches expected, returning the last value read"""
+    player = wait_for_player(session, f"{BACKEND_URL}/players", player_id, expected)
+    return player.get("isActive") if player else None
 
 def debug_toggle_issue():
-    session = requests.Session()
+    session = make_session()
     
     # Get a player
     response = session.get(f"{BACKEND_URL}/players")
-    players = response.json()
+    players = orjson.loads(response.content)
     test_player = players[0]
     player_id = test_player["id"]
     player_name = test_player["name"]
     
-    print(f"Testing with player: {player_name} (ID: {player_id})")
+    logger.info("Testing with player: %s (ID: %s)", player_name, player_id)
     
     # Get initial state
     initial_status = test_player.get("isActive", True)
-    print(f"Initial status: {initial_status}")
+    logger.info("Initial status: %s", initial_status)
     
-    # Toggle 1
-    print("\n--- Toggle 1 ---")
+    # Toggle 1: a single PATCH, then confirm the change reached the database
+    logger.info("\n--- Toggle 1 ---")
     response = session.patch(f"{BACKEND_URL}/players/{player_id}/toggle-active")
-    print(f"Response status: {response.status_code}")
-    if response.status_code == 200:
-        result = response.json()
-        print(f"Response: {result}")
-        expected = not initial_status
-        actual = result.get("isActive")
-        print(f"Expected: {expected}, Got: {actual}, Match: {expected == actual}")
+    logger.info("Response status: %s", response.status_code)
+    if response.status_code != 200:
+        return
     
-    # Check database
-    time.sleep(0.5)
-    response = session.get(f"{BACKEND_URL}/players")
-    players = response.json()
-    player = next((p for p in players if p["id"] == player_id), None)
-    db_status = player.get("isActive") if player else None
-    print(f"Database status: {db_status}")
+    result = orjson.loads(response.content)
+    logger.debug("Response: %s", result)
+    expected = not initial_status
+    actual = result.get("isActive")
+    logger.info("Expected: %s, Got: %s, Match: %s", expected, actual, expected == actual)
     
-    # Toggle 2
-    print("\n--- Toggle 2 ---")
-    response = session.patch(f"{BACKEND_URL}/players/{player_id}/toggle-active")
-    print(f"Response status: {response.status_code}")
-    if response.status_code == 200:
-        result = response.json()
-        print(f"Response: {result}")
-        expected = not db_status
-        actual = result.get("isActive")
-        print(f"Expected: {expected}, Got: {actual}, Match: {expected == actual}")
+    db_status = wait_for_db_status(session, player_id, actual)
+    logger.info("Database status: %s", db_status)
     
-    # Check database again
-    time.sleep(0.5)
-    response = session.get(f"{BACKEND_URL}/players")
-    players = response.json()
-    player = next((p for p in players if p["id"] == player_id), None)
-    db_status_2 = player.get("isActive") if player else None
-    print(f"Database status: {db_status_2}")
+    # Toggles 2 and 3 in a single round trip, starting from the persisted status; history holds the status after each
+    toggle_count = 2
+    response = session.patch(f"{BACKEND_URL}/players/{player_id}/toggle-active", params={"count": toggle_count})
+    logger.info("\nResponse status: %s", response.status_code)
+    if response.status_code != 200:
+        return
     
-    # Toggle 3
-    print("\n--- Toggle 3 ---")
-    response = session.patch(f"{BACKEND_URL}/players/{player_id}/toggle-active")
-    print(f"Response status: {response.status_code}")
-    if response.status_code == 200:
-        result = response.json()
-        print(f"Response: {result}")
-        expected = not db_status_2
-        actual = result.get("isActive")
-        print(f"Expected: {expected}, Got: {actual}, Match: {expected == actual}")
+    result = orjson.loads(response.content)
+    logger.debug("Response: %s", result)
+    history = result.get("history", [])
+    
+    previous = db_status
+    for i, actual in enumerate(history, start=2):
+        logger.info("\n--- Toggle %d ---", i)
+        expected = not previous
+        logger.info("Expected: %s, Got: %s, Match: %s", expected, actual, expected == actual)
+        previous = actual
+    
+    if len(history) != toggle_count:
+        logger.info("\nExpected %d toggles in history, got %d", toggle_count, len(history))
+    
+    # Check database
+    db_status = wait_for_db_status(session, player_id, result.get("isActive"))
+    logger.info("\nDatabase status: %s", db_status)
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.DEBUG if VERBOSE else logging.INFO, format="%(message)s")
     debug_toggle_issue()
\ No newline at end of file
@@ -4,29 +4,73 @@ Backend Testing for CourtChime - Maximize Courts Fix
 Testing the court filling logic to ensure ALL available courts are used first
 """
 
-import requests
-import json
+import os
 import sys
-from typing import Dict, List, Any
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Dict, List, Any, Optional
+
+import orjson
+import requests
+
+from api_session import make_session
 
 # Backend URL from environment
-BACKEND_URL = "https://courtchime.preview.emergentagent.com/api"
+BACKEND_URL = os.getenv("BACKEND_URL", "https://courtchime.preview.emergentagent.com/api")
+VERBOSE = os.getenv("VERBOSE") == "1"  # Also print passing checks, not just failures
+SEED_PLAYER_COUNT = 20  # Largest roster any scenario needs
+PLAYER_CATEGORIES = ("Beginner", "Intermediate", "Advanced")
+# Create-player payloads by roster position, with deterministic IDs so reruns reuse the same players
+SEED_PLAYERS = tuple(
+    {"id": f"p{i+1:02d}", "name": f"TestPlayer{i+1}", "category": PLAYER_CATEGORIES[i % len(PLAYER_CATEGORIES)]}
+    for i in range(SEED_PLAYER_COUNT)
+)
+JSON_HEADERS = {"Content-Type": "application/json"}
+
+@lru_cache(maxsize=32)
+def session_config_body(num_courts: int, allow_doubles: bool, allow_singles: bool, maximize_courts: bool) -> bytes:
+    """Serialized session config for a scenario, built once per distinct combination"""
+    return orjson.dumps({
+        "numCourts": num_courts,
+        "playSeconds": 720,
+        "bufferSeconds": 30,
+        "allowSingles": allow_singles,
+        "allowDoubles": allow_doubles,
+        "allowCrossCategory": True,  # Enable cross-category for testing
+        "maximizeCourtUsage": maximize_courts,
+        "rotationModel": "legacy"
+    })
 
 class MaximizeCourtsBackendTester:
-    def __init__(self):
+    def __init__(self, client: Optional[requests.Session] = None):
         self.backend_url = BACKEND_URL
         self.club_name = "Main Club"
         self.access_code = "demo123"
-        self.session = requests.Session()
+        self.session = client or make_session(retries=3)
+        # Fixed endpoints, formatted once
+        club_query = f"club_name={self.club_name}"
+        self.login_url = f"{self.backend_url}/auth/login"
+        self.clear_all_data_url = f"{self.backend_url}/clear-all-data"
+        self.players_bulk_url = f"{self.backend_url}/players/bulk?{club_query}"
+        self.session_reset_url = f"{self.backend_url}/session/reset?{club_query}"
+        self.session_config_url = f"{self.backend_url}/session/config?{club_query}"
+        self.generate_matches_url = f"{self.backend_url}/session/generate-matches?{club_query}"
+        self.matches_url = f"{self.backend_url}/matches?{club_query}"
+        self.session_url = f"{self.backend_url}/session?{club_query}"
         self.test_results = []
+        self.players: List[Dict[str, Any]] = []
+        self._session_dirty = True  # Whether matches/history may exist that the next scenario must reset
+        self._applied_config: Optional[bytes] = None  # Last config the backend accepted; reset keeps it
         
     def log_result(self, test_name: str, success: bool, details: str = ""):
         """Log test result"""
-        status = "✅ PASS" if success else "❌ FAIL"
-        result = f"{status} - {test_name}"
-        if details:
-            result += f": {details}"
-        print(result)
+        if VERBOSE or not success:
+            status = "✅ PASS" if success else "❌ FAIL"
+            result = f"{status} - {test_name}"
+            if details:
+                result += f": {details}"
+            print(result)
         self.test_results.append({
             'test': test_name,
             'success': success,
@@ -36,13 +80,13 @@ class MaximizeCourtsBackendTester:
     def authenticate(self) -> bool:
         """Authenticate with the backend"""
         try:
-            response = self.session.post(f"{self.backend_url}/auth/login", json={
+            response = self.session.post(self.login_url, json={
                 "club_name": self.club_name,
                 "access_code": self.access_code
             })
             
             if response.status_code == 200:
-                data = response.json()
+                data = orjson.loads(response.content)
                 self.log_result("Authentication", True, f"Logged in as {data.get('club_name')}")
                 return True
             else:
@@ -53,60 +97,71 @@ class MaximizeCourtsBackendTester:
             self.log_result("Authentication", False, f"Error: {str(e)}")
             return False
     
-    def setup_test_players(self, num_players: int) -> bool:
-        """Setup test players for match generation"""
+    def seed_players(self) -> bool:
+        """Reset the club once and seed enough players for every scenario"""
         try:
-            # Clear existing data
-            response = self.session.delete(f"{self.backend_url}/clear-all-data")
+            # Clear existing data (players, matches and sessions) in one call
+            response = self.session.delete(self.clear_all_data_url)
             if response.status_code != 200:
                 self.log_result("Clear Data", False, f"Status: {response.status_code}")
                 return False
             
-            # Clear any existing matches
-            try:
-                self.session.delete(f"{self.backend_url}/matches?club_name={self.club_name}")
-            except:
-                pass  # Ignore if endpoint doesn't exist
-            
-            # Add test data to get base players
-            response = self.session.post(f"{self.backend_url}/add-test-data")
+            # Create the full roster with known IDs in one call; no need to list players afterwards
+            response = self.session.post(
+                self.players_bulk_url,
+                json=list(SEED_PLAYERS)
+            )
             if response.status_code != 200:
-                self.log_result("Add Test Data", False, f"Status: {response.status_code}")
+                self.log_result("Create Players", False, f"Status: {response.status_code}")
                 return False
             
-            # Get current players
-            response = self.session.get(f"{self.backend_url}/players?club_name={self.club_name}")
-            if response.status_code != 200:
+            # New players start inactive
+            players = [{**payload, "isActive": False} for payload in SEED_PLAYERS]
+            
+            self.players = players
+            self._session_dirty = False  # clear-all-data left no matches or session behind
+            self._applied_config = None
+            return True
+            
+        except Exception as e:
+            self.log_result("Seed Players", False, f"Error: {str(e)}")
+            return False
+    
+    def setup_test_players(self, num_players: int) -> bool:
+        """Setup test players for match generation"""
+        try:
+            # Seed the roster once; later scenarios only rewind session state
+            if not self.players and not self.seed_players():
                 return False
-                
-            players = response.json()
             
-            # If we need more players than available, create additional ones
-            if len(players) < num_players:
-                categories = ["Beginner", "Intermediate", "Advanced"]
-                for i in range(len(players), num_players):
-                    player_data = {
-                        "name": f"TestPlayer{i+1}",
-                        "category": categories[i % len(categories)]
-                    }
-                    response = self.session.post(
-                        f"{self.backend_url}/players?club_name={self.club_name}",
-                        json=player_data
-                    )
-                    if response.status_code != 200:
-                        self.log_result("Create Player", False, f"Failed to create player {i+1}")
-                        return False
+            if self._session_dirty:
+                response = self.session.post(self.session_reset_url)
+                if response.status_code != 200:
+                    self.log_result("Reset Session", False, f"Status: {response.status_code}")
+                    return False
+                self._session_dirty = False
+            
+            # Toggle only the players whose active state differs from the scenario; the toggles are independent
+            to_toggle = [(i, player) for i, player in enumerate(self.players)
+                         if player.get('isActive', False) != (i < num_players)]
             
-            # If we have too many players, deactivate some
-            elif len(players) > num_players:
-                for i in range(num_players, len(players)):
-                    player_id = players[i]['id']
-                    response = self.session.patch(
-                        f"{self.backend_url}/players/{player_id}/toggle-active?club_name={self.club_name}"
-                    )
-                    if response.status_code != 200:
-                        self.log_result("Deactivate Player", False, f"Failed to deactivate player {i+1}")
-                        return False
+            def toggle(entry) -> Optional[int]:
+                """Toggle one player, returning its roster position on failure"""
+                i, player = entry
+                response = self.session.patch(
+                    f"{self.backend_url}/players/{player['id']}/toggle-active?club_name={self.club_name}"
+                )
+                if response.status_code != 200:
+                    return i
+                player['isActive'] = orjson.loads(response.content).get('isActive', i < num_players)
+                return None
+            
+            if to_toggle:
+                with ThreadPoolExecutor(max_workers=min(8, len(to_toggle))) as executor:
+                    failed = [i for i in executor.map(toggle, to_toggle) if i is not None]
+                if failed:
+                    self.log_result("Toggle Player", False, f"Failed to toggle player {failed[0]+1}")
+                    return False
             
             self.log_result("Setup Test Players", True, f"Configured {num_players} active players")
             return True
@@ -118,23 +173,20 @@ class MaximizeCourtsBackendTester:
     def update_session_config(self, num_courts: int, allow_doubles: bool = True, allow_singles: bool = True, maximize_courts: bool = True) -> bool:
         """Update session configuration"""
         try:
-            config_data = {
-                "numCourts": num_courts,
-                "playSeconds": 720,
-                "bufferSeconds": 30,
-                "allowSingles": allow_singles,
-                "allowDoubles": allow_doubles,
-                "allowCrossCategory": True,  # Enable cross-category for testing
-                "maximizeCourtUsage": maximize_courts,
-                "rotationModel": "legacy"
-            }
+            config_body = session_config_body(num_courts, allow_doubles, allow_singles, maximize_courts)
+            
+            if config_body == self._applied_config:
+                self.log_result("Update Session Config", True, f"Courts: {num_courts}, Maximize: {maximize_courts} (unchanged)")
+                return True
             
             response = self.session.put(
-                f"{self.backend_url}/session/config?club_name={self.club_name}",
-                json=config_data
+                self.session_config_url,
+                data=config_body,
+                headers=JSON_HEADERS
             )
             
             if response.status_code == 200:
+                self._applied_config = config_body
                 self.log_result("Update Session Config", True, f"Courts: {num_courts}, Maximize: {maximize_courts}")
                 return True
             else:
@@ -149,17 +201,18 @@ class MaximizeCourtsBackendTester:
         """Generate matches and return the matches list"""
         try:
             # First, generate the matches
-            response = self.session.post(f"{self.backend_url}/session/generate-matches?club_name={self.club_name}")
+            self._session_dirty = True
+            response = self.session.post(self.generate_matches_url)
             
             if response.status_code != 200:
                 self.log_result("Generate Matches", False, f"Status: {response.status_code}, Response: {response.text}")
                 return []
             
             # Then, fetch the generated matches
-            response = self.session.get(f"{self.backend_url}/matches?club_name={self.club_name}")
+            response = self.session.get(self.matches_url)
             
             if response.status_code == 200:
-                matches = response.json()
+                matches = orjson.loads(response.content)
                 self.log_result("Generate Matches", True, f"Generated {len(matches)} matches")
                 return matches
             else:
@@ -180,20 +233,17 @@ class MaximizeCourtsBackendTester:
             # Count courts used
             courts_used = set()
             total_players_in_matches = 0
-            doubles_count = 0
-            singles_count = 0
+            match_types = Counter()
             
             for match in matches:
                 courts_used.add(match['courtIndex'])
                 team_a_size = len(match['teamA'])
                 team_b_size = len(match['teamB'])
                 total_players_in_matches += team_a_size + team_b_size
-                
-                if match['matchType'] == 'doubles':
-                    doubles_count += 1
-                elif match['matchType'] == 'singles':
-                    singles_count += 1
+                match_types[match['matchType']] += 1
             
+            doubles_count = match_types['doubles']
+            singles_count = match_types['singles']
             courts_used_count = len(courts_used)
             
             # Check if all expected courts are used (when sufficient players exist)
@@ -220,149 +270,77 @@ class MaximizeCourtsBackendTester:
             self.log_result(test_name, False, f"Analysis error: {str(e)}")
             return False
     
-    def test_16_players_3_courts(self) -> bool:
-        """Test: 16 players, 3 courts (Both Doubles & Singles enabled)
-        Expected: 3 doubles matches (12 players), 4 sitouts, All 3 courts used"""
-        
-        if not self.setup_test_players(16):
+    def run_scenario(self, num_players: int, num_courts: int, expected_courts: int, expected_players_in_matches: int,
+                     test_name: str, allow_doubles: bool = True, allow_singles: bool = True) -> bool:
+        """Set up players and config, generate one round and check court/player usage"""
+        if not self.setup_test_players(num_players):
             return False
         
-        if not self.update_session_config(num_courts=3, allow_doubles=True, allow_singles=True, maximize_courts=True):
+        if not self.update_session_config(num_courts=num_courts, allow_doubles=allow_doubles, allow_singles=allow_singles, maximize_courts=True):
             return False
         
         matches = self.generate_matches()
         if not matches:
             return False
         
-        # Expected: 3 doubles matches using all 3 courts, 12 players in matches, 4 sitouts
-        return self.analyze_match_results(matches, expected_courts=3, expected_players_in_matches=12, test_name="16 Players, 3 Courts")
+        return self.analyze_match_results(matches, expected_courts=expected_courts,
+                                          expected_players_in_matches=expected_players_in_matches, test_name=test_name)
+    
+    def test_16_players_3_courts(self) -> bool:
+        """Test: 16 players, 3 courts (Both Doubles & Singles enabled)
+        Expected: 3 doubles matches (12 players), 4 sitouts, All 3 courts used"""
+        return self.run_scenario(16, 3, expected_courts=3, expected_players_in_matches=12,
+                                 test_name="16 Players, 3 Courts")
     
     def test_10_players_3_courts(self) -> bool:
         """Test: 10 players, 3 courts (Both Doubles & Singles enabled)
         Expected: 2 doubles + 1 singles (10 players), 0 sitouts, All 3 courts used"""
-        
-        if not self.setup_test_players(10):
-            return False
-        
-        if not self.update_session_config(num_courts=3, allow_doubles=True, allow_singles=True, maximize_courts=True):
-            return False
-        
-        matches = self.generate_matches()
-        if not matches:
-            return False
-        
-        # Expected: All 10 players in matches, all 3 courts used
-        return self.analyze_match_results(matches, expected_courts=3, expected_players_in_matches=10, test_name="10 Players, 3 Courts")
+        return self.run_scenario(10, 3, expected_courts=3, expected_players_in_matches=10,
+                                 test_name="10 Players, 3 Courts")
     
     def test_20_players_4_courts(self) -> bool:
         """Test: 20 players, 4 courts (Both Doubles & Singles enabled)
         Expected: 4 doubles matches (16 players), 4 sitouts, All 4 courts used"""
-        
-        if not self.setup_test_players(20):
-            return False
-        
-        if not self.update_session_config(num_courts=4, allow_doubles=True, allow_singles=True, maximize_courts=True):
-            return False
-        
-        matches = self.generate_matches()
-        if not matches:
-            return False
-        
-        # Expected: 4 doubles matches using all 4 courts, 16 players in matches, 4 sitouts
-        return self.analyze_match_results(matches, expected_courts=4, expected_players_in_matches=16, test_name="20 Players, 4 Courts")
+        return self.run_scenario(20, 4, expected_courts=4, expected_players_in_matches=16,
+                                 test_name="20 Players, 4 Courts")
     
     def test_14_players_5_courts(self) -> bool:
         """Test: 14 players, 5 courts (Both Doubles & Singles enabled)
         Expected: 3 doubles + 1 singles (14 players), 0 sitouts, 4 courts used"""
-        
-        if not self.setup_test_players(14):
-            return False
-        
-        if not self.update_session_config(num_courts=5, allow_doubles=True, allow_singles=True, maximize_courts=True):
-            return False
-        
-        matches = self.generate_matches()
-        if not matches:
-            return False
-        
-        # Expected: All 14 players in matches, 4 courts used (1 court empty)
-        return self.analyze_match_results(matches, expected_courts=4, expected_players_in_matches=14, test_name="14 Players, 5 Courts")
+        return self.run_scenario(14, 5, expected_courts=4, expected_players_in_matches=14,
+                                 test_name="14 Players, 5 Courts")
     
     def test_12_players_3_courts_doubles_only(self) -> bool:
         """Test: 12 players, 3 courts (Doubles only)
         Expected: 3 doubles matches, 0 sitouts, All 3 courts used"""
-        
-        if not self.setup_test_players(12):
-            return False
-        
-        if not self.update_session_config(num_courts=3, allow_doubles=True, allow_singles=False, maximize_courts=True):
-            return False
-        
-        matches = self.generate_matches()
-        if not matches:
-            return False
-        
-        # Expected: 3 doubles matches, all 12 players in matches, all 3 courts used
-        return self.analyze_match_results(matches, expected_courts=3, expected_players_in_matches=12, test_name="12 Players, 3 Courts (Doubles Only)")
+        return self.run_scenario(12, 3, expected_courts=3, expected_players_in_matches=12,
+                                 test_name="12 Players, 3 Courts (Doubles Only)", allow_singles=False)
     
     def test_12_players_3_courts_singles_only(self) -> bool:
         """Test: 12 players, 3 courts (Singles only)
         Expected: 3 singles matches (6 players), 6 sitouts, All 3 courts used"""
-        
-        if not self.setup_test_players(12):
-            return False
-        
-        if not self.update_session_config(num_courts=3, allow_doubles=False, allow_singles=True, maximize_courts=True):
-            return False
-        
-        matches = self.generate_matches()
-        if not matches:
-            return False
-        
-        # Expected: 3 singles matches, 6 players in matches, 6 sitouts, all 3 courts used
-        return self.analyze_match_results(matches, expected_courts=3, expected_players_in_matches=6, test_name="12 Players, 3 Courts (Singles Only)")
+        return self.run_scenario(12, 3, expected_courts=3, expected_players_in_matches=6,
+                                 test_name="12 Players, 3 Courts (Singles Only)", allow_doubles=False)
     
     def test_4_players_3_courts(self) -> bool:
         """Test: 4 players, 3 courts (Edge case - very few players)
         Expected: 1 doubles match, 1 court used"""
-        
-        if not self.setup_test_players(4):
-            return False
-        
-        if not self.update_session_config(num_courts=3, allow_doubles=True, allow_singles=True, maximize_courts=True):
-            return False
-        
-        matches = self.generate_matches()
-        if not matches:
-            return False
-        
-        # Expected: 1 doubles match, 4 players in matches, 1 court used
-        return self.analyze_match_results(matches, expected_courts=1, expected_players_in_matches=4, test_name="4 Players, 3 Courts (Edge Case)")
+        return self.run_scenario(4, 3, expected_courts=1, expected_players_in_matches=4,
+                                 test_name="4 Players, 3 Courts (Edge Case)")
     
     def test_8_players_10_courts(self) -> bool:
         """Test: 8 players, 10 courts (Many courts, few players)
         Expected: 2 doubles matches, 2 courts used"""
-        
-        if not self.setup_test_players(8):
-            return False
-        
-        if not self.update_session_config(num_courts=10, allow_doubles=True, allow_singles=True, maximize_courts=True):
-            return False
-        
-        matches = self.generate_matches()
-        if not matches:
-            return False
-        
-        # Expected: 2 doubles matches, 8 players in matches, 2 courts used
-        return self.analyze_match_results(matches, expected_courts=2, expected_players_in_matches=8, test_name="8 Players, 10 Courts (Many Courts)")
+        return self.run_scenario(8, 10, expected_courts=2, expected_players_in_matches=8,
+                                 test_name="8 Players, 10 Courts (Many Courts)")
     
     def test_session_configuration_verification(self) -> bool:
         """Verify session configuration is properly read"""
         try:
-            response = self.session.get(f"{self.backend_url}/session?club_name={self.club_name}")
+            response = self.session.get(self.session_url)
             
             if response.status_code == 200:
-                session_data = response.json()
+                session_data = orjson.loads(response.content)
                 config = session_data.get('config', {})
                 
                 # Check if maximizeCourtUsage is properly set
@@ -428,7 +406,8 @@ class MaximizeCourtsBackendTester:
 
 def main():
     """Main test execution"""
-    tester = MaximizeCourtsBackendTester()
+    client = make_session(retries=3, trust_env=os.getenv("BACKEND_SKIP_ENV") != "1")
+    tester = MaximizeCourtsBackendTester(client=client)
     success = tester.run_all_tests()
     
     if success:
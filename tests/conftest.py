@@ -0,0 +1,36 @@
+import asyncio
+import os
+import sys
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backend"))
+
+import server  # noqa: E402
+from database import Base, get_db_session  # noqa: E402
+
+
+@pytest.fixture
+def client(tmp_path):
+    """TestClient for the API backed by a fresh SQLite file instead of courtchime.db"""
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'test.db'}")
+    test_session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    async def create_tables():
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+
+    asyncio.run(create_tables())
+
+    async def override_get_db_session():
+        async with test_session() as session:
+            yield session
+
+    server.app.dependency_overrides[get_db_session] = override_get_db_session
+    # Not used as a context manager, so the startup hook never touches the real database
+    yield TestClient(server.app)
+    server.app.dependency_overrides.clear()
+    asyncio.run(engine.dispose())
@@ -0,0 +1,70 @@
+PLAYERS = [
+    {"id": "p01", "name": "Alice", "category": "Beginner"},
+    {"id": "p02", "name": "Bob", "category": "Intermediate"},
+    {"id": "p03", "name": "Cara", "category": "Advanced"},
+]
+
+
+def test_health(client):
+    response = client.get("/api/health")
+    assert response.status_code == 200
+    assert response.json() == {"status": "ok"}
+
+
+def test_bulk_create_returns_ids(client):
+    response = client.post("/api/players/bulk", json=PLAYERS)
+    assert response.status_code == 200
+    body = response.json()
+    assert body["count"] == 3
+    assert body["ids"] == ["p01", "p02", "p03"]
+
+    players = client.get("/api/players").json()
+    assert sorted(p["id"] for p in players) == ["p01", "p02", "p03"]
+
+
+def test_bulk_create_generates_missing_ids(client):
+    response = client.post("/api/players/bulk", json=[{"name": "Dan", "category": "Beginner"}])
+    assert response.status_code == 200
+    assert len(response.json()["ids"]) == 1
+    assert response.json()["ids"][0]
+
+
+def test_bulk_create_duplicate_in_request_conflicts(client):
+    response = client.post("/api/players/bulk", json=[PLAYERS[0], {**PLAYERS[1], "id": "p01"}])
+    assert response.status_code == 409
+    assert client.get("/api/players").json() == []
+
+
+def test_bulk_create_existing_id_conflicts(client):
+    assert client.post("/api/players", json=PLAYERS[0]).status_code == 200
+    response = client.post("/api/players/bulk", json=PLAYERS)
+    assert response.status_code == 409
+    assert [p["id"] for p in client.get("/api/players").json()] == ["p01"]
+
+
+def test_create_existing_id_conflicts(client):
+    assert client.post("/api/players", json=PLAYERS[0]).status_code == 200
+    response = client.post("/api/players", json=PLAYERS[0])
+    assert response.status_code == 409
+
+
+def test_create_rejects_unsafe_id(client):
+    response = client.post("/api/players", json={**PLAYERS[0], "id": "a/b"})
+    assert response.status_code == 422
+
+
+def test_toggle_count_returns_history(client):
+    client.post("/api/players", json=PLAYERS[0])
+    response = client.patch("/api/players/p01/toggle-active", params={"count": 3})
+    assert response.status_code == 200
+    body = response.json()
+    # New players start inactive
+    assert body["history"] == [True, False, True]
+    assert body["isActive"] is True
+
+
+def test_toggle_count_above_cap_rejected(client):
+    client.post("/api/players", json=PLAYERS[0])
+    response = client.patch("/api/players/p01/toggle-active", params={"count": 11})
+    assert response.status_code == 422
+    assert client.get("/api/players").json()[0]["isActive"] is False